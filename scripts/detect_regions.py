@@ -8,9 +8,13 @@ Usage: python detect_regions.py <image_path>
 Output (stdout): JSON object with { "regions": [ [[x,y], [x,y], ...], ... ], "width": N, "height": N }
 """
 
+import os
 import sys
 import json
+import hashlib
 import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 try:
     import cv2
@@ -36,31 +40,105 @@ def _parse_template_box(s):
         return None
 
 
-def _contours_to_regions(contours, min_area, max_regions):
-    """Convert contours to region polygons, filtered by area."""
+def _cuda_available():
+    """True when OpenCV was built with CUDA and a device is present."""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except Exception:
+        return False
+
+
+_USE_CUDA = _cuda_available()
+# Below this pixel count, upload/download latency outweighs the GPU win
+_CUDA_MIN_PIXELS = 512 * 512
+
+# Shared rectangular structuring elements; every strategy was allocating its
+# own np.ones kernel per call.
+_K3 = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+_K5 = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+
+# Files above this size get a half-resolution decode (IMREAD_REDUCED_COLOR_2);
+# for JPEGs the decimation happens during IDCT, so decode itself is ~4x faster
+# and the full-resolution image is never materialized.
+_REDUCED_DECODE_BYTES = 4 * 1024 * 1024
+
+
+def _close_open(mask, kernel):
+    """Fused MORPH_CLOSE followed by MORPH_OPEN with the same rectangular kernel.
+
+    close+open expands to dilate-erode-erode-dilate; the two middle erosions
+    collapse into one erosion with the doubled kernel (exact for rectangular
+    SEs), saving a full image pass, and dst= reuse avoids two intermediate
+    allocations.
+    """
+    kh, kw = kernel.shape[:2]
+    doubled = np.ones((2 * kh - 1, 2 * kw - 1), np.uint8)
+    out = cv2.dilate(mask, kernel)
+    cv2.erode(out, doubled, dst=out)
+    cv2.dilate(out, kernel, dst=out)
+    return out
+
+
+class _ImageCtx:
+    """Shared derived views of the working image.
+
+    detect_regions builds one per call. Strategies that used to re-derive
+    their own blur or gradient pull it from here instead, so each
+    derivation runs at most once even when strategies probe each other
+    (template_match calls the circle strategies internally).
+    """
+
+    __slots__ = ("img", "gray", "blurred", "_blurred15", "_grad")
+
+    def __init__(self, img, gray, blurred):
+        self.img = img
+        self.gray = gray
+        self.blurred = blurred
+        self._blurred15 = None
+        self._grad = None
+
+    @property
+    def blurred15(self):
+        """Sigma-1.5 Gaussian blur the circle strategies prefer."""
+        if self._blurred15 is None:
+            self._blurred15 = cv2.GaussianBlur(self.gray, (5, 5), 1.5)
+        return self._blurred15
+
+    @property
+    def grad(self):
+        """Gradient magnitude of the grayscale image (template matching)."""
+        if self._grad is None:
+            self._grad = _gradient_magnitude(self.gray)
+        return self._grad
+
+
+def _contours_to_regions(contours, min_area, max_regions, simplify="polygon"):
+    """Convert contours to region polygons, filtered by area.
+
+    simplify: "polygon" approximates each contour with Douglas-Peucker;
+    "bbox" takes the axis-aligned bounding rect instead, skipping the
+    arcLength + approxPolyDP traversals entirely.
+    """
+    # Keep the area cv2.contourArea already computed and sort on it directly,
+    # instead of re-deriving it per polygon during the sort.
     regions = []
     for c in contours:
         area = cv2.contourArea(c)
         if area < min_area:
             continue
-        peri = cv2.arcLength(c, True)
-        approx = cv2.approxPolyDP(c, 0.02 * peri, True)
-        if len(approx) < 3:
-            continue
-        poly = [[int(p[0][0]), int(p[0][1])] for p in approx]
-        regions.append(poly)
-
-    def poly_area(p):
-        return abs(
-            sum(
-                (p[i][0] * p[(i + 1) % len(p)][1] - p[(i + 1) % len(p)][0] * p[i][1])
-                for i in range(len(p))
-            )
-            / 2
-        )
+        if simplify == "bbox":
+            x, y, bw, bh = cv2.boundingRect(c)
+            poly = [[x, y], [x + bw, y], [x + bw, y + bh], [x, y + bh]]
+        else:
+            peri = cv2.arcLength(c, True)
+            approx = cv2.approxPolyDP(c, 0.02 * peri, True)
+            if len(approx) < 3:
+                continue
+            poly = approx.reshape(-1, 2).tolist()
+        regions.append((area, poly))
 
-    regions.sort(key=poly_area, reverse=True)
-    return regions[:max_regions]
+    regions.sort(key=lambda t: t[0], reverse=True)
+    return [poly for _, poly in regions[:max_regions]]
 
 
 def _fallback_center_regions(w, h, max_regions=5):
@@ -81,15 +159,35 @@ def _color_segmentation_regions(img, min_area, max_regions, n_clusters=12):
     Good for color wheels, palettes, and images with distinct color blocks.
     """
     lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
-    pixels = lab.reshape(-1, 3).astype(np.float32)
     criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-    _, labels, centers = cv2.kmeans(
-        pixels, n_clusters, None, criteria, 3, cv2.KMEANS_PP_CENTERS
-    )
-    labels = labels.reshape(img.shape[:2])
+    # Quantize LAB into a 32^3 histogram and cluster the unique bin colors
+    # instead of every pixel: a few thousand samples instead of W*H, with
+    # near-identical centers. Pixel labels come back via the inverse index.
+    bins = (lab.reshape(-1, 3) >> 3).astype(np.int32)
+    keys = bins[:, 0] * 1024 + bins[:, 1] * 32 + bins[:, 2]
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    if len(uniq) > n_clusters:
+        samples = (
+            np.stack([uniq // 1024, (uniq // 32) % 32, uniq % 32], axis=1).astype(np.float32)
+            * 8 + 4
+        )
+        _, bin_labels, centers = cv2.kmeans(
+            samples, n_clusters, None, criteria, 3, cv2.KMEANS_PP_CENTERS
+        )
+        labels = bin_labels.ravel()[inverse]
+    else:
+        # Fewer distinct colors than clusters: cluster pixels directly
+        pixels = lab.reshape(-1, 3).astype(np.float32)
+        _, labels, centers = cv2.kmeans(
+            pixels, n_clusters, None, criteria, 3, cv2.KMEANS_PP_CENTERS
+        )
+    labels = labels.reshape(img.shape[:2]).astype(np.int32)
+    # Total pixel count per cluster bounds any contour's area, so clusters
+    # below min_area can be skipped without building their masks at all.
+    counts = np.bincount(labels.ravel(), minlength=n_clusters)
     regions = []
-    for i in range(n_clusters):
-        mask = np.uint8(labels == i)
+    for i in np.flatnonzero(counts >= min_area):
+        mask = cv2.compare(labels, int(i), cv2.CMP_EQ)
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         for c in contours:
             area = cv2.contourArea(c)
@@ -99,51 +197,60 @@ def _color_segmentation_regions(img, min_area, max_regions, n_clusters=12):
             approx = cv2.approxPolyDP(c, 0.02 * peri, True)
             if len(approx) < 3:
                 continue
-            poly = [[int(p[0][0]), int(p[0][1])] for p in approx]
-            regions.append(poly)
-    # Sort by area, take largest
-    def poly_area(p):
-        return abs(
-            sum(
-                (p[i][0] * p[(i + 1) % len(p)][1] - p[(i + 1) % len(p)][0] * p[i][1])
-                for i in range(len(p))
-            )
-            / 2
-        )
-    regions.sort(key=poly_area, reverse=True)
-    return regions[:max_regions]
+            poly = approx.reshape(-1, 2).tolist()
+            regions.append((area, poly))
+    # Sort by the contour area computed above, take largest
+    regions.sort(key=lambda t: t[0], reverse=True)
+    return [poly for _, poly in regions[:max_regions]]
 
 
-def _strategy_adaptive(gray, blurred, min_area, max_regions, block_size=11, c=2):
+def _strategy_adaptive(gray, blurred, min_area, max_regions, block_size=11, c=2,
+                       simplify="polygon"):
     """Strategy: Adaptive threshold on grayscale."""
     block = max(3, min(31, block_size if block_size % 2 else block_size + 1))
     thresh = cv2.adaptiveThreshold(
         blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, block, c
     )
-    kernel = np.ones((3, 3), np.uint8)
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
+    thresh = _close_open(thresh, _K3)
     contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    return _contours_to_regions(contours, min_area, max_regions)
+    return _contours_to_regions(contours, min_area, max_regions, simplify=simplify)
 
 
-def _strategy_otsu(gray, blurred, min_area, max_regions):
+def _strategy_otsu(gray, blurred, min_area, max_regions, simplify="polygon"):
     """Strategy: Otsu global threshold."""
     _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    kernel = np.ones((3, 3), np.uint8)
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
+    thresh = _close_open(thresh, _K3)
     contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    return _contours_to_regions(contours, min_area, max_regions)
+    return _contours_to_regions(contours, min_area, max_regions, simplify=simplify)
 
 
-def _strategy_canny(gray, blurred, min_area, max_regions, low=50, high=150):
+def _strategy_canny(gray, blurred, min_area, max_regions, low=50, high=150,
+                    simplify="polygon"):
     """Strategy: Canny edges + dilation + contours."""
-    edges = cv2.Canny(blurred, int(low), int(high))
-    kernel = np.ones((5, 5), np.uint8)
-    edges = cv2.dilate(edges, kernel)
+    src = blurred
+    scale = 1
+    if max(blurred.shape[:2]) >= 1024:
+        # Canny cost is linear in pixels and strong edges survive a 2x
+        # reduction; contours are scaled back below so areas and polygons
+        # stay in the caller's coordinate space.
+        src = cv2.pyrDown(blurred)
+        scale = 2
+    edges = None
+    if _USE_CUDA and src.size >= _CUDA_MIN_PIXELS:
+        try:
+            gsrc = cv2.cuda_GpuMat()
+            gsrc.upload(src)
+            detector = cv2.cuda.createCannyEdgeDetector(int(low), int(high))
+            edges = detector.detect(gsrc).download()
+        except cv2.error:
+            edges = None
+    if edges is None:
+        edges = cv2.Canny(src, int(low), int(high))
+    edges = cv2.dilate(edges, _K5)
     contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    return _contours_to_regions(contours, min_area, max_regions)
+    if scale > 1:
+        contours = [c * scale for c in contours]
+    return _contours_to_regions(contours, min_area, max_regions, simplify=simplify)
 
 
 def _strategy_color(img, min_area, max_regions, n_clusters=12):
@@ -151,7 +258,8 @@ def _strategy_color(img, min_area, max_regions, n_clusters=12):
     return _color_segmentation_regions(img, min_area, max_regions, n_clusters=int(n_clusters))
 
 
-def _strategy_grabcut(img, min_area, max_regions, rect_pad=0.1, iter_count=5):
+def _strategy_grabcut(img, min_area, max_regions, rect_pad=0.1, iter_count=5,
+                      simplify="polygon"):
     """
     Strategy: GrabCut with auto rect (center 80% as foreground guess).
     Good for product shots, portraits, subject on plain background.
@@ -167,11 +275,14 @@ def _strategy_grabcut(img, min_area, max_regions, rect_pad=0.1, iter_count=5):
         cv2.grabCut(img, mask, rect, bgd_model, fgd_model, iter_count, cv2.GC_INIT_WITH_RECT)
     except Exception:
         return []
-    fg_mask = np.where((mask == 1) | (mask == 3), 255, 0).astype(np.uint8)
-    kernel = np.ones((3, 3), np.uint8)
-    fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_CLOSE, kernel)
+    # GC_FGD (1) and GC_PR_FGD (3) are the only label values with bit 0 set,
+    # so a bitwise AND + in-place scale yields the foreground mask without
+    # the two boolean temporaries np.where allocated
+    fg_mask = cv2.bitwise_and(mask, 1)
+    fg_mask *= 255
+    fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_CLOSE, _K3)
     contours, _ = cv2.findContours(fg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    return _contours_to_regions(contours, min_area, max_regions)
+    return _contours_to_regions(contours, min_area, max_regions, simplify=simplify)
 
 
 def _strategy_slic(img, min_area, max_regions, region_size=25, ruler=10.0):
@@ -192,12 +303,11 @@ def _strategy_slic(img, min_area, max_regions, region_size=25, ruler=10.0):
     slic.iterate(10)
     labels = slic.getLabels()
     regions = []
-    unique_labels = np.unique(labels)
-    for lab in unique_labels:
-        mask = np.uint8(labels == lab)
-        area = cv2.countNonZero(mask)
-        if area < min_area:
-            continue
+    # Per-label pixel counts in one pass; skip labels too small to matter
+    # before materializing any mask.
+    counts = np.bincount(labels.ravel())
+    for lab in np.flatnonzero(counts >= min_area):
+        mask = cv2.compare(labels, int(lab), cv2.CMP_EQ)
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         for c in contours:
             a = cv2.contourArea(c)
@@ -207,21 +317,13 @@ def _strategy_slic(img, min_area, max_regions, region_size=25, ruler=10.0):
             approx = cv2.approxPolyDP(c, 0.02 * peri, True)
             if len(approx) < 3:
                 continue
-            poly = [[int(p[0][0]), int(p[0][1])] for p in approx]
-            regions.append(poly)
-    def poly_area(p):
-        return abs(
-            sum(
-                (p[i][0] * p[(i + 1) % len(p)][1] - p[(i + 1) % len(p)][0] * p[i][1])
-                for i in range(len(p))
-            )
-            / 2
-        )
-    regions.sort(key=poly_area, reverse=True)
-    return regions[:max_regions]
+            poly = approx.reshape(-1, 2).tolist()
+            regions.append((a, poly))
+    regions.sort(key=lambda t: t[0], reverse=True)
+    return [poly for _, poly in regions[:max_regions]]
 
 
-def _strategy_saliency(img, min_area, max_regions):
+def _strategy_saliency(img, min_area, max_regions, simplify="polygon"):
     """
     Strategy: Saliency detection (attention regions).
     Good for finding main subject in photos.
@@ -237,12 +339,13 @@ def _strategy_saliency(img, min_area, max_regions):
     success, saliency_map = saliency.computeSaliency(img)
     if not success or saliency_map is None:
         return []
-    saliency_map = (saliency_map * 255).astype(np.uint8)
+    # convertScaleAbs scales and narrows to uint8 in one C pass, without
+    # the float temporary (saliency_map * 255) materialized
+    saliency_map = cv2.convertScaleAbs(saliency_map, alpha=255)
     _, thresh = cv2.threshold(saliency_map, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    kernel = np.ones((5, 5), np.uint8)
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, _K5)
     contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    return _contours_to_regions(contours, min_area, max_regions)
+    return _contours_to_regions(contours, min_area, max_regions, simplify=simplify)
 
 
 def _strategy_meanshift(img, min_area, max_regions, spatial_radius=15, color_radius=40):
@@ -252,16 +355,56 @@ def _strategy_meanshift(img, min_area, max_regions, spatial_radius=15, color_rad
     """
     spatial_radius = max(1, min(50, int(spatial_radius)))
     color_radius = max(1, min(100, int(color_radius)))
-    shifted = cv2.pyrMeanShiftFiltering(img, spatial_radius, color_radius)
+    h, w = img.shape[:2]
+    # Mean shift cost grows with pixels * window area; run it (and the
+    # follow-up k-means) on a 2x downsampled copy, halving the spatial
+    # radius to keep the window in the same image-space units, then bring
+    # the labels back up with a nearest-neighbor resize.
+    small = cv2.pyrDown(img)
+    shifted = None
+    if _USE_CUDA and small.shape[0] * small.shape[1] >= _CUDA_MIN_PIXELS:
+        try:
+            gsrc = cv2.cuda_GpuMat()
+            gsrc.upload(cv2.cvtColor(small, cv2.COLOR_BGR2BGRA))
+            gshift = cv2.cuda.meanShiftFiltering(
+                gsrc, max(1, spatial_radius // 2), color_radius
+            )
+            shifted = cv2.cvtColor(gshift.download(), cv2.COLOR_BGRA2BGR)
+        except cv2.error:
+            shifted = None
+    if shifted is None:
+        # Without explicit termination criteria OpenCV iterates each window
+        # to convergence (default 5 iters / eps 1, but spelled out so the
+        # bound is deliberate): mean shift is O(N * iterations * radius^2).
+        shifted = cv2.pyrMeanShiftFiltering(
+            small, max(1, spatial_radius // 2), color_radius,
+            termcrit=(cv2.TERM_CRITERIA_MAX_ITER + cv2.TERM_CRITERIA_EPS, 5, 1.0),
+        )
     lab = cv2.cvtColor(shifted, cv2.COLOR_BGR2LAB)
     pixels = lab.reshape(-1, 3).astype(np.float32)
     n_clusters = min(12, max(4, (img.size // (300 * 300)) + 4))
     criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-    _, labels, _ = cv2.kmeans(pixels, n_clusters, None, criteria, 3, cv2.KMEANS_PP_CENTERS)
-    labels = labels.reshape(img.shape[:2])
+    n_pixels = pixels.shape[0]
+    if n_pixels > 10000:
+        # Learn centers from a 10k random sample, then assign every pixel
+        # with one vectorized distance pass — running Lloyd's over all
+        # pixels (x3 attempts) re-derives near-identical centers slowly.
+        rng = np.random.default_rng(0)
+        sample = pixels[rng.choice(n_pixels, size=10000, replace=False)]
+        _, _, centers = cv2.kmeans(sample, n_clusters, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+        d = pixels @ centers.T
+        d *= -2.0
+        d += (pixels * pixels).sum(axis=1, keepdims=True)
+        d += (centers * centers).sum(axis=1)
+        labels = d.argmin(axis=1).astype(np.int32)
+    else:
+        _, labels, _ = cv2.kmeans(pixels, n_clusters, None, criteria, 3, cv2.KMEANS_PP_CENTERS)
+    labels = labels.reshape(small.shape[:2]).astype(np.int32)
+    labels = cv2.resize(labels, (w, h), interpolation=cv2.INTER_NEAREST)
+    counts = np.bincount(labels.ravel(), minlength=n_clusters)
     regions = []
-    for i in range(n_clusters):
-        mask = np.uint8(labels == i)
+    for i in np.flatnonzero(counts >= min_area):
+        mask = cv2.compare(labels, int(i), cv2.CMP_EQ)
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         for c in contours:
             area = cv2.contourArea(c)
@@ -271,87 +414,89 @@ def _strategy_meanshift(img, min_area, max_regions, spatial_radius=15, color_rad
             approx = cv2.approxPolyDP(c, 0.02 * peri, True)
             if len(approx) < 3:
                 continue
-            poly = [[int(p[0][0]), int(p[0][1])] for p in approx]
-            regions.append(poly)
-    def poly_area(p):
-        return abs(
-            sum(
-                (p[i][0] * p[(i + 1) % len(p)][1] - p[(i + 1) % len(p)][0] * p[i][1])
-                for i in range(len(p))
-            )
-            / 2
-        )
-    regions.sort(key=poly_area, reverse=True)
-    return regions[:max_regions]
+            poly = approx.reshape(-1, 2).tolist()
+            regions.append((area, poly))
+    regions.sort(key=lambda t: t[0], reverse=True)
+    return [poly for _, poly in regions[:max_regions]]
 
 
-def _strategy_quadtree(img, min_area, max_regions, variance_threshold=500, min_quad_size=32):
+def _strategy_quadtree(img, gray, min_area, max_regions, variance_threshold=500, min_quad_size=32):
     """
-    Strategy: Recursive quadtree split by color variance.
+    Strategy: Quadtree split by color variance.
     Good for flat designs, UI mockups, geometric layouts.
     """
     h, w = img.shape[:2]
-
-    def _variance_rect(img_slice):
-        if img_slice.size == 0:
-            return 0
-        gray = cv2.cvtColor(img_slice, cv2.COLOR_BGR2GRAY) if len(img_slice.shape) == 3 else img_slice
-        return float(np.var(gray))
-
-    def _split_quad(x, y, rw, rh, depth=0, max_depth=8):
-        rect = (x, y, rw, rh)
+    # Integral images of gray and gray^2 make any rectangle's variance an
+    # O(1) four-corner lookup (var = E[x^2] - E[x]^2), instead of a full
+    # cvtColor + np.var pass over every candidate quad. 64-bit tables: the
+    # default int32 sum overflows once a rect's pixel sum passes 2^31
+    # (~8.4 MP of bright pixels), well within a full-resolution run.
+    sum_img, sum_sq = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+    def _variance_rect(x, y, rw, rh):
+        n = rw * rh
+        if n == 0:
+            return 0.0
+        s = sum_img[y + rh, x + rw] - sum_img[y, x + rw] - sum_img[y + rh, x] + sum_img[y, x]
+        s2 = sum_sq[y + rh, x + rw] - sum_sq[y, x + rw] - sum_sq[y + rh, x] + sum_sq[y, x]
+        return float(s2 / n - (s / n) ** 2)
+
+    # Split iteratively with an explicit stack; avoids Python call overhead
+    # and any recursion-depth concerns
+    max_depth = 8
+    rects = []
+    stack = [(0, 0, w, h, 0)]
+    while stack:
+        x, y, rw, rh, depth = stack.pop()
         if rw < min_quad_size or rh < min_quad_size or depth >= max_depth:
-            return [rect] if rw >= 2 and rh >= 2 else []
-        crop = img[y : y + rh, x : x + rw]
-        var = _variance_rect(crop)
-        if var < variance_threshold:
-            return [rect]
+            if rw >= 2 and rh >= 2:
+                rects.append((x, y, rw, rh))
+            continue
+        if _variance_rect(x, y, rw, rh) < variance_threshold:
+            rects.append((x, y, rw, rh))
+            continue
         hw, hh = rw // 2, rh // 2
         if hw < 2 or hh < 2:
-            return [rect]
-        quads = []
-        for (qx, qy, qw, qh) in [
-            (x, y, hw, hh),
-            (x + hw, y, rw - hw, hh),
-            (x, y + hh, hw, rh - hh),
-            (x + hw, y + hh, rw - hw, rh - hh),
-        ]:
-            quads.extend(_split_quad(qx, qy, qw, qh, depth + 1, max_depth))
-        return quads
-
-    rects = _split_quad(0, 0, w, h)
+            rects.append((x, y, rw, rh))
+            continue
+        stack.extend([
+            (x, y, hw, hh, depth + 1),
+            (x + hw, y, rw - hw, hh, depth + 1),
+            (x, y + hh, hw, rh - hh, depth + 1),
+            (x + hw, y + hh, rw - hw, rh - hh, depth + 1),
+        ])
     regions = []
     for (qx, qy, qw, qh) in rects:
         area = qw * qh
         if area < min_area:
             continue
         poly = [[qx, qy], [qx + qw, qy], [qx + qw, qy + qh], [qx, qy + qh]]
-        regions.append(poly)
-    def poly_area(p):
-        return abs(
-            sum(
-                (p[i][0] * p[(i + 1) % len(p)][1] - p[(i + 1) % len(p)][0] * p[i][1])
-                for i in range(len(p))
-            )
-            / 2
-        )
-    regions.sort(key=poly_area, reverse=True)
-    return regions[:max_regions]
+        regions.append((area, poly))
+    regions.sort(key=lambda t: t[0], reverse=True)
+    return [poly for _, poly in regions[:max_regions]]
+
+
+@functools.lru_cache(maxsize=8)
+def _unit_circle(num_points):
+    """Cached (cos, sin) table for a unit circle with num_points vertices.
+
+    Every detected circle reuses the same table; only the first call per
+    point count pays for the trig.
+    """
+    angles = np.linspace(0, 2 * np.pi, num_points, endpoint=False)
+    return np.cos(angles), np.sin(angles)
 
 
 def _circle_to_polygon(cx, cy, radius, num_points=24):
     """Convert circle (cx, cy, radius) to polygon vertices."""
-    pts = []
-    for i in range(num_points):
-        angle = 2 * np.pi * i / num_points
-        x = cx + radius * np.cos(angle)
-        y = cy + radius * np.sin(angle)
-        pts.append([int(round(x)), int(round(y))])
-    return pts
+    cos_t, sin_t = _unit_circle(num_points)
+    xs = cx + radius * cos_t
+    ys = cy + radius * sin_t
+    return np.stack([xs, ys], axis=1).round().astype(np.int32).tolist()
 
 
-def _strategy_circles(img, min_area, max_regions, min_radius_ratio=0.02, max_radius_ratio=0.45,
-                      param1=80, param2=35, min_dist_ratio=0.07):
+def _strategy_circles(img, gray, min_area, max_regions, min_radius_ratio=0.02, max_radius_ratio=0.45,
+                      param1=80, param2=35, min_dist_ratio=0.07, ctx=None):
     """
     Strategy: Detect circles via Hough transform.
     Good for round shapes, buttons, coins, eyes, etc.
@@ -359,8 +504,8 @@ def _strategy_circles(img, min_area, max_regions, min_radius_ratio=0.02, max_rad
     param2: Accumulator threshold (lower = more circles, more false positives). Try 20-80.
     min_dist_ratio: Min distance between circle centers as fraction of min image dimension (e.g. 0.07 = 7%). Set to 0 for auto (2*max_r).
     """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 1.5)
+    # Hough wants a stronger blur (sigma 1.5) than the shared buffer
+    blurred = ctx.blurred15 if ctx is not None else cv2.GaussianBlur(gray, (5, 5), 1.5)
     h, w = img.shape[:2]
     min_dim = min(w, h)
     min_r = max(5, int(min_dim * min_radius_ratio))
@@ -390,28 +535,19 @@ def _strategy_circles(img, min_area, max_regions, min_radius_ratio=0.02, max_rad
             if area < min_area:
                 continue
             poly = _circle_to_polygon(cx, cy, r)
-            regions.append(poly)
-    def poly_area(p):
-        return abs(
-            sum(
-                (p[i][0] * p[(i + 1) % len(p)][1] - p[(i + 1) % len(p)][0] * p[i][1])
-                for i in range(len(p))
-            )
-            / 2
-        )
-    regions.sort(key=poly_area, reverse=True)
-    return regions[:max_regions]
+            regions.append((area, poly))
+    regions.sort(key=lambda t: t[0], reverse=True)
+    return [poly for _, poly in regions[:max_regions]]
 
 
-def _strategy_contour_circles(img, min_area, max_regions, min_radius_ratio=0.02, max_radius_ratio=0.45,
-                              circularity_min=0.75):
+def _strategy_contour_circles(img, gray, min_area, max_regions, min_radius_ratio=0.02, max_radius_ratio=0.45,
+                              circularity_min=0.75, ctx=None):
     """
     Strategy: Find circle-like regions by contour circularity (no Hough).
     Threshold to get blobs, then keep contours with high circularity (4*pi*area/perim^2).
     Often more reliable than Hough for clear circles on flat background (e.g. color swatches).
     """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 1.5)
+    blurred = ctx.blurred15 if ctx is not None else cv2.GaussianBlur(gray, (5, 5), 1.5)
     h, w = img.shape[:2]
     min_dim = min(w, h)
     min_r = max(5, int(min_dim * min_radius_ratio))
@@ -420,25 +556,43 @@ def _strategy_contour_circles(img, min_area, max_regions, min_radius_ratio=0.02,
         max_r = min_r + 10
     # Otsu: usually separates dark background from lighter circles
     _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    # Also try inverted in case circles are darker than background
-    _, thresh_inv = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
     regions = []
     seen_centers = []  # avoid duplicate from both thresh and thresh_inv
-    for binary in (thresh, thresh_inv):
+    for pass_idx in range(2):
+        if pass_idx == 0:
+            binary = thresh
+        else:
+            # The inverted pass only catches circles darker than the
+            # background; skip it when the normal threshold already filled
+            # the quota. Otsu picks the same level either way, so inversion
+            # is a bitwise NOT rather than a second histogram scan.
+            if len(regions) >= max_regions:
+                break
+            binary = cv2.bitwise_not(thresh)
         contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        for c in contours:
-            area = cv2.contourArea(c)
-            if area < min_area:
-                continue
-            peri = cv2.arcLength(c, True)
-            if peri < 1e-6:
-                continue
-            circularity = 4 * np.pi * area / (peri * peri)
-            if circularity < circularity_min:
-                continue
-            equiv_r = np.sqrt(area / np.pi)
-            if equiv_r < min_r or equiv_r > max_r:
-                continue
+        if not contours:
+            continue
+        # Batch the cheap geometric tests into arrays so only surviving
+        # contours pay for minEnclosingCircle and the center dedup. The
+        # epsilon in the circularity denominator covers degenerate
+        # near-zero perimeters (their area fails min_area anyway).
+        areas = np.fromiter(
+            (cv2.contourArea(c) for c in contours), dtype=np.float32, count=len(contours)
+        )
+        # Area is the cheapest test and rejects most noise contours, so only
+        # the survivors pay for arcLength and the circularity math
+        big = np.flatnonzero(areas >= min_area)
+        if len(big) == 0:
+            continue
+        perims = np.fromiter(
+            (cv2.arcLength(contours[i], True) for i in big), dtype=np.float32, count=len(big)
+        )
+        circularity = 4 * np.pi * areas[big] / (perims * perims + 1e-9)
+        equiv_r = np.sqrt(areas[big] / np.pi)
+        keep = (circularity >= circularity_min) & (equiv_r >= min_r) & (equiv_r <= max_r)
+        for i in big[keep]:
+            c = contours[i]
+            area = float(areas[i])
             (cx, cy), r = cv2.minEnclosingCircle(c)
             cx, cy, r = int(cx), int(cy), int(round(r))
             # skip if we already have a circle with center very close (from other binary)
@@ -446,36 +600,33 @@ def _strategy_contour_circles(img, min_area, max_regions, min_radius_ratio=0.02,
                 continue
             seen_centers.append((cx, cy))
             poly = _circle_to_polygon(cx, cy, r)
-            regions.append(poly)
-    def poly_area(p):
-        return abs(
-            sum(
-                (p[i][0] * p[(i + 1) % len(p)][1] - p[(i + 1) % len(p)][0] * p[i][1])
-                for i in range(len(p))
-            )
-            / 2
-        )
-    regions.sort(key=poly_area, reverse=True)
-    return regions[:max_regions]
+            regions.append((area, poly))
+    regions.sort(key=lambda t: t[0], reverse=True)
+    return [poly for _, poly in regions[:max_regions]]
 
 
 def _local_maxima_2d(result_map, threshold, min_dist_px):
     """Return list of (x, y) top-left positions of local maxima above threshold, at least min_dist_px apart."""
-    h, w = result_map.shape[:2]
-    peaks = []
-    while True:
-        _, max_val, _, max_loc = cv2.minMaxLoc(result_map)
-        if max_val < threshold:
-            break
-        x, y = max_loc[0], max_loc[1]
-        peaks.append((x, y))
-        # suppress neighborhood
-        y1 = max(0, y - min_dist_px)
-        y2 = min(h, y + min_dist_px + 1)
-        x1 = max(0, x - min_dist_px)
-        x2 = min(w, x + min_dist_px + 1)
-        result_map[y1:y2, x1:x2] = -1
-    return peaks
+    # One SIMD dilation + compare finds all candidate maxima at once, instead
+    # of a full-image minMaxLoc reduction per peak.
+    k = 2 * min_dist_px + 1
+    dil = cv2.dilate(result_map, np.ones((k, k), np.uint8))
+    ys, xs = np.where((result_map == dil) & (result_map >= threshold))
+    if len(xs) == 0:
+        return []
+    vals = result_map[ys, xs]
+    # Suppress candidates within min_dist_px (Chebyshev) of a stronger one
+    # with cv2.dnn.NMSBoxes: squares of side min_dist_px + 1 overlap exactly
+    # when centers are that close, and an IoU threshold of 0 suppresses on
+    # any overlap — same rule as the old greedy Python pass, run in C.
+    side = min_dist_px + 1
+    boxes = np.stack(
+        [xs, ys, np.full_like(xs, side), np.full_like(ys, side)], axis=1
+    ).astype(np.float32)
+    keep = cv2.dnn.NMSBoxes(boxes, vals.astype(np.float32), float(threshold), 0.0)
+    keep = np.asarray(keep).ravel()
+    # NMSBoxes walks candidates strongest-first; preserve that peak order
+    return [(int(xs[i]), int(ys[i])) for i in keep]
 
 
 def _polygon_centroid(poly):
@@ -501,13 +652,97 @@ def _gradient_magnitude(img):
         gray = img
     gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
     gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
-    mag = np.sqrt(gx * gx + gy * gy)
-    return np.uint8(np.clip(mag, 0, 255))
+    # cv2.magnitude fuses the square/sum/sqrt into one SIMD pass, and
+    # convertScaleAbs does the saturating clip+cast without NumPy temporaries
+    return cv2.convertScaleAbs(cv2.magnitude(gx, gy))
+
 
+def _template_stats(template_grad):
+    """Zero-mean template and its sum of squared deviations, in one pass each.
 
-def _strategy_template_match(img, min_area, max_regions, min_radius_ratio=0.02, max_radius_ratio=0.45,
+    Computed once per match call and handed to the correlation path, so
+    neither the mean nor the SSD is re-derived downstream.
+    """
+    t = template_grad.astype(np.float32)
+    t0 = t - float(t.mean())
+    t_ssd = float(np.dot(t0.ravel(), t0.ravel()))
+    return t0, t_ssd
+
+
+def _ccoeff_normed_split(img_grad, t0, t_ssd):
+    """TM_CCOEFF_NORMED computed as a raw TM_CCORR pass plus separate
+    window-sum normalization.
+
+    t0/t_ssd are the precomputed zero-mean template and its SSD (see
+    _template_stats). Subtracting the template mean up front makes the
+    CCOEFF numerator a plain cross-correlation (the window-mean term
+    cancels because the zero-mean template sums to zero), which OpenCV
+    runs through its DFT path unburdened by per-window normalization. The
+    denominator's window sum and sum of squares come from two unnormalized
+    box filters.
+    """
+    timg = img_grad.astype(np.float32)
+    th, tw = t0.shape[:2]
+    n = float(th * tw)
+    if t_ssd <= 1e-12:
+        # Flat template: correlation is undefined, match nothing
+        h, w = timg.shape[:2]
+        return np.zeros((h - th + 1, w - tw + 1), np.float32)
+    num = cv2.matchTemplate(timg, t0, cv2.TM_CCORR)
+    # Summed-area tables give every window's sum and sum of squares from
+    # four corner lookups each; the full-map slices below evaluate all
+    # windows at once and land exactly on the response-map shape.
+    sum_i, sum_i2 = cv2.integral2(timg)
+    win_sum = sum_i[th:, tw:] - sum_i[:-th, tw:] - sum_i[th:, :-tw] + sum_i[:-th, :-tw]
+    win_sumsq = sum_i2[th:, tw:] - sum_i2[:-th, tw:] - sum_i2[th:, :-tw] + sum_i2[:-th, :-tw]
+    win_var = np.maximum(win_sumsq - win_sum * win_sum / n, 0)
+    denom = np.sqrt(t_ssd * win_var)
+    # Zero-variance windows (flat background — the bulk of a gradient
+    # image) still carry rounding noise in the raw CCORR numerator, so a
+    # floor on the denominator would blow them up into huge fake peaks.
+    # Zero the response there instead, like OpenCV's fused path, using an
+    # epsilon scaled to the data.
+    eps = np.finfo(np.float32).eps * np.sqrt(t_ssd) * n
+    out = np.zeros(num.shape, np.float64)
+    np.divide(num, denom, out=out, where=denom > eps)
+    return out.astype(np.float32)
+
+
+def _match_template_peaks(gray, template_crop, match_threshold, min_dist_ratio,
+                          img_grad=None):
+    """Match a template crop against the image and return peak top-left coords.
+
+    Matching runs on gradient magnitude (structure/edges, brightness
+    invariant). Direct correlation cost grows with template area, so for
+    templates beyond 64x64 both gradients are halved with pyrDown first —
+    matching tolerates the moderate blur — and peaks are scaled back.
+    """
+    tc_h, tc_w = template_crop.shape[:2]
+    if img_grad is None:
+        img_grad = _gradient_magnitude(gray)
+    template_grad = _gradient_magnitude(template_crop)
+    scale = 1
+    if tc_w * tc_h > 64 * 64:
+        img_grad = cv2.pyrDown(img_grad)
+        template_grad = cv2.pyrDown(template_grad)
+        scale = 2
+    if template_grad.size > 18 * 18:
+        # Beyond ~18x18 the split CCORR + box-sum normalization wins over
+        # matchTemplate's fused normalized path
+        t0, t_ssd = _template_stats(template_grad)
+        result = _ccoeff_normed_split(img_grad, t0, t_ssd)
+    else:
+        result = cv2.matchTemplate(img_grad, template_grad, cv2.TM_CCOEFF_NORMED)
+    min_dist_px = max(2, int(max(tc_w, tc_h) * min_dist_ratio) // scale)
+    peaks = _local_maxima_2d(result, match_threshold, min_dist_px)
+    if scale > 1:
+        peaks = [(px * scale, py * scale) for px, py in peaks]
+    return peaks
+
+
+def _strategy_template_match(img, gray, min_area, max_regions, min_radius_ratio=0.02, max_radius_ratio=0.45,
                              contour_circles_circularity=0.75, match_threshold=0.7, min_dist_ratio=0.8,
-                             template_box=None):
+                             template_box=None, ctx=None):
     """
     Strategy: Use one detected region as a template, find similar regions via normalized cross-correlation.
     If template_box (x, y, w, h) is provided, use that crop as the template; otherwise run contour_circles probe.
@@ -519,15 +754,10 @@ def _strategy_template_match(img, min_area, max_regions, min_radius_ratio=0.02,
         y = max(0, min(int(y), h - 1))
         tw = max(5, min(int(tw), w - x))
         th = max(5, min(int(th), h - y))
-        template_crop = img[y : y + th, x : x + tw]
+        template_crop = gray[y : y + th, x : x + tw]
         tc_h, tc_w = template_crop.shape[:2]
-        # Gradient magnitude: matches structure/edges, invariant to brightness (treats dark and bright equally)
-        img_grad = _gradient_magnitude(img)
-        template_grad = _gradient_magnitude(template_crop)
-        result = cv2.matchTemplate(img_grad, template_grad, cv2.TM_CCOEFF_NORMED)
-        min_dist_px = int(max(tc_w, tc_h) * min_dist_ratio)
-        min_dist_px = max(2, min_dist_px)
-        peaks = _local_maxima_2d(result.copy(), match_threshold, min_dist_px)
+        peaks = _match_template_peaks(gray, template_crop, match_threshold, min_dist_ratio,
+                                      img_grad=ctx.grad if ctx is not None else None)
         template_poly = [[x, y], [x + tc_w, y], [x + tc_w, y + tc_h], [x, y + tc_h]]
         poly_cx, poly_cy = _polygon_centroid(template_poly)
         regions = []
@@ -538,33 +768,28 @@ def _strategy_template_match(img, min_area, max_regions, min_radius_ratio=0.02,
             dy = match_center_y - poly_cy
             translated = _translate_polygon(template_poly, dx, dy)
             regions.append(translated)
-        def poly_area(p):
-            return abs(
-                sum(
-                    (p[i][0] * p[(i + 1) % len(p)][1] - p[(i + 1) % len(p)][0] * p[i][1])
-                    for i in range(len(p))
-                )
-                / 2
-            )
-        regions.sort(key=poly_area, reverse=True)
+        # All regions are translated copies of one template polygon, so an
+        # area sort is a no-op; keep the strongest-match-first peak order.
         return regions[:max_regions]
 
     min_dim = min(w, h)
     min_area_probe = int(min_dim * min_dim * 0.002)  # loose area for probe
     # Get one sample region using contour_circles
     probe_regions = _strategy_contour_circles(
-        img, min_area_probe, max_regions=1,
+        img, gray, min_area_probe, max_regions=1,
         min_radius_ratio=min_radius_ratio,
         max_radius_ratio=max_radius_ratio,
         circularity_min=contour_circles_circularity,
+        ctx=ctx,
     )
     if not probe_regions:
         # fallback: try Hough to get one circle
         probe_regions = _strategy_circles(
-            img, min_area_probe, max_regions=1,
+            img, gray, min_area_probe, max_regions=1,
             min_radius_ratio=min_radius_ratio,
             max_radius_ratio=max_radius_ratio,
             param1=80, param2=35, min_dist_ratio=0.07,
+            ctx=ctx,
         )
     if not probe_regions:
         return []
@@ -577,15 +802,10 @@ def _strategy_template_match(img, min_area, max_regions, min_radius_ratio=0.02,
     tw, th = x2 - x1, y2 - y1
     if tw < 5 or th < 5:
         return [template_poly][:max_regions]
-    template_crop = img[y1:y2, x1:x2]
+    template_crop = gray[y1:y2, x1:x2]
     tc_h, tc_w = template_crop.shape[:2]
-    # Gradient magnitude: matches structure/edges, invariant to brightness
-    img_grad = _gradient_magnitude(img)
-    template_grad = _gradient_magnitude(template_crop)
-    result = cv2.matchTemplate(img_grad, template_grad, cv2.TM_CCOEFF_NORMED)
-    min_dist_px = int(max(tc_w, tc_h) * min_dist_ratio)
-    min_dist_px = max(2, min_dist_px)
-    peaks = _local_maxima_2d(result.copy(), match_threshold, min_dist_px)
+    peaks = _match_template_peaks(gray, template_crop, match_threshold, min_dist_ratio,
+                                  img_grad=ctx.grad if ctx is not None else None)
     # Template centroid in template coords (relative to crop top-left)
     poly_cx, poly_cy = _polygon_centroid(template_poly)
     # Match result is top-left of template; center of match is (px + tc_w/2, py + tc_h/2)
@@ -598,28 +818,17 @@ def _strategy_template_match(img, min_area, max_regions, min_radius_ratio=0.02,
         dy = match_center_y - poly_cy
         translated = _translate_polygon(template_poly, dx, dy)
         regions.append(translated)
-    def poly_area(p):
-        return abs(
-            sum(
-                (p[i][0] * p[(i + 1) % len(p)][1] - p[(i + 1) % len(p)][0] * p[i][1])
-                for i in range(len(p))
-            )
-            / 2
-        )
-    regions.sort(key=poly_area, reverse=True)
+    # Same-template copies: area sort would be a no-op (see above)
     return regions[:max_regions]
 
 
-def _strategy_rectangles(img, min_area, max_regions, epsilon_ratio=0.05):
+def _strategy_rectangles(img, gray, blurred, min_area, max_regions, epsilon_ratio=0.05):
     """
     Strategy: Detect rectangular contours (4-vertex approx).
     Good for panels, windows, screens, documents, UI elements.
     """
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
     _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    kernel = np.ones((3, 3), np.uint8)
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, _K3)
     contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     regions = []
     for c in contours:
@@ -631,27 +840,16 @@ def _strategy_rectangles(img, min_area, max_regions, epsilon_ratio=0.05):
         approx = cv2.approxPolyDP(c, eps, True)
         if len(approx) != 4:
             continue
-        poly = [[int(p[0][0]), int(p[0][1])] for p in approx]
-        regions.append(poly)
-    def poly_area(p):
-        return abs(
-            sum(
-                (p[i][0] * p[(i + 1) % len(p)][1] - p[(i + 1) % len(p)][0] * p[i][1])
-                for i in range(len(p))
-            )
-            / 2
-        )
-    regions.sort(key=poly_area, reverse=True)
-    return regions[:max_regions]
+        poly = approx.reshape(-1, 2).tolist()
+        regions.append((area, poly))
+    regions.sort(key=lambda t: t[0], reverse=True)
+    return [poly for _, poly in regions[:max_regions]]
 
 
-def _strategy_watershed(img, min_area, max_regions, dist_ratio=0.5):
+def _strategy_watershed(img, gray, blurred, min_area, max_regions, dist_ratio=0.5):
     """Strategy: Watershed on distance transform markers."""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
     _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    kernel = np.ones((3, 3), np.uint8)
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, _K3)
     dist = cv2.distanceTransform(thresh, cv2.DIST_L2, 5)
     ratio = max(0.1, min(0.9, dist_ratio))
     _, sure_fg = cv2.threshold(dist, ratio * dist.max(), 255, 0)
@@ -664,7 +862,9 @@ def _strategy_watershed(img, min_area, max_regions, dist_ratio=0.5):
     markers = cv2.watershed(img3, markers)
     regions = []
     for label in range(2, ret + 1):
-        mask = np.uint8(markers == label)
+        # 0/255 uint8 mask straight from the int32 markers, skipping the
+        # boolean intermediate
+        mask = cv2.compare(markers, label, cv2.CMP_EQ)
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         for c in contours:
             area = cv2.contourArea(c)
@@ -674,18 +874,111 @@ def _strategy_watershed(img, min_area, max_regions, dist_ratio=0.5):
             approx = cv2.approxPolyDP(c, 0.02 * peri, True)
             if len(approx) < 3:
                 continue
-            poly = [[int(p[0][0]), int(p[0][1])] for p in approx]
-            regions.append(poly)
-    def poly_area(p):
-        return abs(
-            sum(
-                (p[i][0] * p[(i + 1) % len(p)][1] - p[(i + 1) % len(p)][0] * p[i][1])
-                for i in range(len(p))
-            )
-            / 2
-        )
-    regions.sort(key=poly_area, reverse=True)
-    return regions[:max_regions]
+            poly = approx.reshape(-1, 2).tolist()
+            regions.append((area, poly))
+    regions.sort(key=lambda t: t[0], reverse=True)
+    return [poly for _, poly in regions[:max_regions]]
+
+
+def _strategy_default(img, gray, blurred, min_area, max_regions, simplify="polygon",
+                      parallel=True):
+    """Strategy: cascade through adaptive -> otsu -> canny, color as tiebreaker.
+
+    The four strategies are independent OpenCV pipelines that release the
+    GIL, so by default they run concurrently and wall-clock is the slowest
+    single strategy; result selection keeps the original priority order.
+    parallel=False restores the sequential cascade, which skips later
+    strategies entirely when an earlier one succeeds — cheaper on a loaded
+    or single-core machine.
+    """
+    if not parallel:
+        regions = _strategy_adaptive(gray, blurred, min_area, max_regions, simplify=simplify)
+        if not regions:
+            regions = _strategy_otsu(gray, blurred, min_area, max_regions, simplify=simplify)
+        if not regions:
+            regions = _strategy_canny(gray, blurred, min_area, max_regions, simplify=simplify)
+        if len(regions) <= 2:
+            color_regions = _strategy_color(img, min_area, max_regions)
+            if len(color_regions) > len(regions):
+                regions = color_regions
+        return regions
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        fut_adaptive = ex.submit(_strategy_adaptive, gray, blurred, min_area, max_regions,
+                                 simplify=simplify)
+        fut_otsu = ex.submit(_strategy_otsu, gray, blurred, min_area, max_regions,
+                             simplify=simplify)
+        fut_canny = ex.submit(_strategy_canny, gray, blurred, min_area, max_regions,
+                              simplify=simplify)
+        fut_color = ex.submit(_strategy_color, img, min_area, max_regions)
+        regions = fut_adaptive.result()
+        if not regions:
+            regions = fut_otsu.result()
+        if not regions:
+            regions = fut_canny.result()
+        if len(regions) <= 2:
+            color_regions = fut_color.result()
+            if len(color_regions) > len(regions):
+                regions = color_regions
+    return regions
+
+
+# Strategy dispatch table: name -> callable(img, gray, blurred, p) where p is
+# the detect_regions parameter namespace. Keeps selection O(1) and builds only
+# the keyword arguments the chosen strategy actually takes.
+_STRATEGIES = {
+    "adaptive": lambda img, gray, blurred, p: _strategy_adaptive(
+        gray, blurred, p["min_area"], p["max_regions"],
+        block_size=p["adaptive_block_size"], c=p["adaptive_c"],
+        simplify=p["simplify"]),
+    "otsu": lambda img, gray, blurred, p: _strategy_otsu(
+        gray, blurred, p["min_area"], p["max_regions"], simplify=p["simplify"]),
+    "canny": lambda img, gray, blurred, p: _strategy_canny(
+        gray, blurred, p["min_area"], p["max_regions"],
+        low=p["canny_low"], high=p["canny_high"], simplify=p["simplify"]),
+    "color": lambda img, gray, blurred, p: _strategy_color(
+        img, p["min_area"], p["max_regions"], n_clusters=p["color_clusters"]),
+    "watershed": lambda img, gray, blurred, p: _strategy_watershed(
+        img, gray, blurred, p["min_area"], p["max_regions"],
+        dist_ratio=p["watershed_dist_ratio"]),
+    "grabcut": lambda img, gray, blurred, p: _strategy_grabcut(
+        img, p["min_area"], p["max_regions"],
+        rect_pad=p["grabcut_rect_pad"], iter_count=p["grabcut_iter_count"],
+        simplify=p["simplify"]),
+    "slic": lambda img, gray, blurred, p: _strategy_slic(
+        img, p["min_area"], p["max_regions"],
+        region_size=p["slic_region_size"], ruler=p["slic_ruler"]),
+    "saliency": lambda img, gray, blurred, p: _strategy_saliency(
+        img, p["min_area"], p["max_regions"], simplify=p["simplify"]),
+    "meanshift": lambda img, gray, blurred, p: _strategy_meanshift(
+        img, p["min_area"], p["max_regions"],
+        spatial_radius=p["meanshift_spatial"], color_radius=p["meanshift_color"]),
+    "quadtree": lambda img, gray, blurred, p: _strategy_quadtree(
+        img, gray, p["min_area"], p["max_regions"],
+        variance_threshold=p["quadtree_variance"],
+        min_quad_size=p["quadtree_min_size"]),
+    "circles": lambda img, gray, blurred, p: _strategy_circles(
+        img, gray, p["min_area"], p["max_regions"],
+        min_radius_ratio=p["circles_min_radius_ratio"],
+        max_radius_ratio=p["circles_max_radius_ratio"],
+        param1=p["circles_param1"], param2=p["circles_param2"],
+        min_dist_ratio=p["circles_min_dist_ratio"], ctx=p["ctx"]),
+    "rectangles": lambda img, gray, blurred, p: _strategy_rectangles(
+        img, gray, blurred, p["min_area"], p["max_regions"],
+        epsilon_ratio=p["rectangles_epsilon_ratio"]),
+    "contour_circles": lambda img, gray, blurred, p: _strategy_contour_circles(
+        img, gray, p["min_area"], p["max_regions"],
+        min_radius_ratio=p["circles_min_radius_ratio"],
+        max_radius_ratio=p["circles_max_radius_ratio"],
+        circularity_min=p["contour_circles_circularity"], ctx=p["ctx"]),
+    "template_match": lambda img, gray, blurred, p: _strategy_template_match(
+        img, gray, p["min_area"], p["max_regions"],
+        min_radius_ratio=p["circles_min_radius_ratio"],
+        max_radius_ratio=p["circles_max_radius_ratio"],
+        contour_circles_circularity=p["contour_circles_circularity"],
+        match_threshold=p["template_match_threshold"],
+        min_dist_ratio=p["template_match_min_dist_ratio"],
+        template_box=p["template_box"], ctx=p["ctx"]),
+}
 
 
 def detect_regions(
@@ -717,121 +1010,219 @@ def detect_regions(
     template_match_min_dist_ratio=0.8,
     rectangles_epsilon_ratio=0.05,
     template_box=None,
+    max_side=1024,
+    simplify="polygon",
+    parallel=True,
 ):
     """
     Detect large contiguous regions using OpenCV.
     strategy: "default", "adaptive", "otsu", "canny", "color", "watershed",
               "grabcut", "slic", "saliency", "meanshift", "quadtree", "circles", "rectangles"
+    max_side: process at reduced resolution when the longest side exceeds
+              this (0/None disables); output coordinates are scaled back.
+    simplify: "polygon" (default) or "bbox" — bbox skips Douglas-Peucker and
+              returns axis-aligned bounding rects for contour-based strategies.
     Returns (regions, w, h, err).
     """
-    img = cv2.imread(image_path)
+    decode_scale = 1
+    try:
+        oversized = os.path.getsize(image_path) > _REDUCED_DECODE_BYTES
+    except OSError:
+        oversized = False
+    if max_side and oversized:
+        img = cv2.imread(image_path, cv2.IMREAD_REDUCED_COLOR_2)
+        decode_scale = 2
+    else:
+        img = cv2.imread(image_path)
     if img is None:
         return None, None, None, "Could not read image"
 
+    # Reconstruct original dimensions from a reduced decode (exact to within
+    # one pixel for odd sizes; coordinates scale back consistently either way)
     h, w = img.shape[:2]
-    total_area = h * w
+    h *= decode_scale
+    w *= decode_scale
+
+    # Every strategy's cost scales with pixel count, and polygons are
+    # approximated at ~2% of perimeter, so detail beyond max_side is wasted.
+    # Detect on a reduced copy and scale coordinates back at the end.
+    scale = 1.0
+    if max_side and max(h, w) > max_side:
+        scale = max(h, w) / float(max_side)
+    if scale > decode_scale:
+        img = cv2.resize(
+            img, (int(w / scale), int(h / scale)), interpolation=cv2.INTER_AREA
+        )
+    else:
+        scale = float(decode_scale)
+    if scale > 1 and template_box is not None:
+        # Coordinates may legitimately land on 0; only the size needs a
+        # floor (the strategy enforces its own >=5 px minimums anyway)
+        bx, by, bw, bh = template_box
+        template_box = (
+            max(0, int(bx / scale)),
+            max(0, int(by / scale)),
+            max(1, int(bw / scale)),
+            max(1, int(bh / scale)),
+        )
+
+    total_area = img.shape[0] * img.shape[1]
     min_area = int(total_area * min_area_ratio)
 
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    ctx = _ImageCtx(img, gray, blurred)
 
     regions = []
-
-    if strategy == "adaptive":
-        regions = _strategy_adaptive(
-            gray, blurred, min_area, max_regions,
-            block_size=adaptive_block_size, c=adaptive_c
-        )
-    elif strategy == "otsu":
-        regions = _strategy_otsu(gray, blurred, min_area, max_regions)
-    elif strategy == "canny":
-        regions = _strategy_canny(
-            gray, blurred, min_area, max_regions,
-            low=canny_low, high=canny_high
-        )
-    elif strategy == "color":
-        regions = _strategy_color(img, min_area, max_regions, n_clusters=color_clusters)
-    elif strategy == "watershed":
-        regions = _strategy_watershed(
-            img, min_area, max_regions,
-            dist_ratio=watershed_dist_ratio
-        )
-    elif strategy == "grabcut":
-        regions = _strategy_grabcut(
-            img, min_area, max_regions,
-            rect_pad=grabcut_rect_pad, iter_count=grabcut_iter_count
-        )
-    elif strategy == "slic":
+    ran_cascade = False
+
+    fn = _STRATEGIES.get(strategy)
+    if fn is not None:
+        # Explicit bag of everything the _STRATEGIES lambdas consume; each
+        # pulls just what its strategy needs.
+        params = {
+            "min_area": min_area,
+            "max_regions": max_regions,
+            "simplify": simplify,
+            "ctx": ctx,
+            "adaptive_block_size": adaptive_block_size,
+            "adaptive_c": adaptive_c,
+            "canny_low": canny_low,
+            "canny_high": canny_high,
+            "color_clusters": color_clusters,
+            "watershed_dist_ratio": watershed_dist_ratio,
+            "grabcut_rect_pad": grabcut_rect_pad,
+            "grabcut_iter_count": grabcut_iter_count,
+            "slic_region_size": slic_region_size,
+            "slic_ruler": slic_ruler,
+            "meanshift_spatial": meanshift_spatial,
+            "meanshift_color": meanshift_color,
+            "quadtree_variance": quadtree_variance,
+            "quadtree_min_size": quadtree_min_size,
+            "circles_min_radius_ratio": circles_min_radius_ratio,
+            "circles_max_radius_ratio": circles_max_radius_ratio,
+            "circles_param1": circles_param1,
+            "circles_param2": circles_param2,
+            "circles_min_dist_ratio": circles_min_dist_ratio,
+            "contour_circles_circularity": contour_circles_circularity,
+            "template_match_threshold": template_match_threshold,
+            "template_match_min_dist_ratio": template_match_min_dist_ratio,
+            "rectangles_epsilon_ratio": rectangles_epsilon_ratio,
+            "template_box": template_box,
+        }
         try:
-            regions = _strategy_slic(
-                img, min_area, max_regions,
-                region_size=slic_region_size, ruler=slic_ruler
-            )
+            regions = fn(img, gray, blurred, params)
         except RuntimeError as e:
+            # e.g. SLIC when opencv-contrib ximgproc is unavailable
             return None, w, h, str(e)
-    elif strategy == "saliency":
-        regions = _strategy_saliency(img, min_area, max_regions)
-    elif strategy == "meanshift":
-        regions = _strategy_meanshift(
-            img, min_area, max_regions,
-            spatial_radius=meanshift_spatial, color_radius=meanshift_color
-        )
-    elif strategy == "quadtree":
-        regions = _strategy_quadtree(
-            img, min_area, max_regions,
-            variance_threshold=quadtree_variance, min_quad_size=quadtree_min_size
-        )
-    elif strategy == "circles":
-        regions = _strategy_circles(
-            img, min_area, max_regions,
-            min_radius_ratio=circles_min_radius_ratio,
-            max_radius_ratio=circles_max_radius_ratio,
-            param1=circles_param1,
-            param2=circles_param2,
-            min_dist_ratio=circles_min_dist_ratio,
-        )
-    elif strategy == "rectangles":
-        regions = _strategy_rectangles(
-            img, min_area, max_regions,
-            epsilon_ratio=rectangles_epsilon_ratio,
-        )
-    elif strategy == "contour_circles":
-        regions = _strategy_contour_circles(
-            img, min_area, max_regions,
-            min_radius_ratio=circles_min_radius_ratio,
-            max_radius_ratio=circles_max_radius_ratio,
-            circularity_min=contour_circles_circularity,
-        )
-    elif strategy == "template_match":
-        regions = _strategy_template_match(
-            img, min_area, max_regions,
-            min_radius_ratio=circles_min_radius_ratio,
-            max_radius_ratio=circles_max_radius_ratio,
-            contour_circles_circularity=contour_circles_circularity,
-            match_threshold=template_match_threshold,
-            min_dist_ratio=template_match_min_dist_ratio,
-            template_box=template_box,
-        )
     else:
-        # default: cascade through strategies
-        regions = _strategy_adaptive(gray, blurred, min_area, max_regions)
-        if not regions:
-            regions = _strategy_otsu(gray, blurred, min_area, max_regions)
-        if not regions:
-            regions = _strategy_canny(gray, blurred, min_area, max_regions)
-        if len(regions) <= 2:
-            color_regions = _strategy_color(img, min_area, max_regions)
-            if len(color_regions) > len(regions):
-                regions = color_regions
-        if not regions:
-            regions = _fallback_center_regions(w, h, max_regions)
+        ran_cascade = True
+        regions = _strategy_default(img, gray, blurred, min_area, max_regions,
+                                    simplify=simplify, parallel=parallel)
+
+    if scale > 1 and regions:
+        # Scale polygon coordinates back to the original resolution
+        regions = [[[int(x * scale), int(y * scale)] for x, y in p] for p in regions]
+
+    if ran_cascade and not regions:
+        regions = _fallback_center_regions(w, h, max_regions)
 
     return regions, w, h, None
 
 
+def detect_regions_batch(paths, n_jobs=None, **kwargs):
+    """Detect regions in many images using parallel worker processes.
+
+    Images are independent, so coarse parallelism across inputs scales
+    near-linearly with cores — the better grain than threading inside one
+    image. Results come back in input order as (regions, w, h, err)
+    tuples. n_jobs=None uses the executor default (CPU count); 1 runs
+    inline without spawning workers.
+    """
+    if n_jobs == 1 or len(paths) <= 1:
+        return [detect_regions(path, **kwargs) for path in paths]
+    with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+        futures = [ex.submit(detect_regions, path, **kwargs) for path in paths]
+        return [f.result() for f in futures]
+
+
+def _cache_path(image_path, params):
+    """Cache file path for this (image bytes, parameters) pair.
+
+    blake2b over the raw file bytes plus the JSON-serialized parameters;
+    repeated tuning runs on the same image hit the same directory.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    cache_dir = os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+        "color-palette-maker", "regions",
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, h.hexdigest() + ".json")
+
+
+def _serve(base_kwargs):
+    """JSON-lines daemon: one request per stdin line, one result per stdout line.
+
+    Each request is an object with "image_path" plus any detect_regions
+    keyword overrides; CLI flags supply the defaults. Keeps one warm
+    process so pipeline callers pay the interpreter startup and OpenCV
+    import once instead of per image (hundreds of ms each).
+    """
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            req = json.loads(line)
+            if not isinstance(req, dict):
+                raise ValueError("request must be a JSON object")
+            image_path = req.pop("image_path")
+        except (ValueError, KeyError) as e:
+            print(json.dumps({"error": "bad request: %s" % e}), flush=True)
+            continue
+        kwargs = dict(base_kwargs)
+        kwargs.update({k: v for k, v in req.items() if k in base_kwargs})
+        if isinstance(kwargs.get("template_box"), list):
+            kwargs["template_box"] = tuple(kwargs["template_box"])
+        try:
+            regions, width, height, err = detect_regions(image_path, **kwargs)
+        except Exception as e:
+            # A wrongly-typed override (e.g. "max_side": "abc") must answer
+            # with an error line, not take down the long-lived server
+            print(json.dumps({"error": "bad request: %s" % e}), flush=True)
+            continue
+        if err:
+            print(json.dumps({"error": err}), flush=True)
+            continue
+        print(
+            json.dumps(
+                {"regions": regions, "width": width, "height": height},
+                separators=(",", ":"),
+            ),
+            flush=True,
+        )
+
+
 def main():
+    # Fast path for the common host-app invocation `detect_regions.py img`:
+    # skip building the ~35-option argparse parser, which is pure fixed
+    # overhead when every parameter is a default.
+    if len(sys.argv) == 2 and not sys.argv[1].startswith("-"):
+        regions, width, height, err = detect_regions(sys.argv[1])
+        if err:
+            print(json.dumps({"error": err}), file=sys.stderr)
+            sys.exit(1)
+        out = {"regions": regions, "width": width, "height": height}
+        print(json.dumps(out, separators=(",", ":")))
+        return
+
     parser = argparse.ArgumentParser(description="Detect large regions in an image")
-    parser.add_argument("image_path", help="Path to input image")
+    parser.add_argument("image_path", nargs="?", default=None, help="Path to input image (omit with --serve)")
     parser.add_argument(
         "--min-area",
         type=float,
@@ -878,10 +1269,16 @@ def main():
     parser.add_argument("--template-match-min-dist-ratio", type=float, default=0.8, help="Template match: min distance between matches as fraction of template size (0.5-1.0)")
     parser.add_argument("--template-box", type=str, default=None, help="Template match: x,y,w,h for user-drawn template region (e.g. 10,20,40,40)")
     parser.add_argument("--rectangles-epsilon-ratio", type=float, default=0.05, help="Rectangles: contour approx epsilon as fraction of perimeter (0.02-0.15)")
+    parser.add_argument("--max-side", type=int, default=1024, help="Process at reduced resolution when longest side exceeds this; 0 disables (default 1024)")
+    parser.add_argument("--simplify", type=str, default="polygon", choices=["polygon", "bbox"], help="Region shape: approximated polygon or axis-aligned bounding box (faster)")
+    parser.add_argument("--no-parallel", action="store_true", help="Run the default cascade sequentially instead of in worker threads")
+    parser.add_argument("--cache", action="store_true", help="Cache results on disk keyed by image bytes + parameters; repeated runs are free")
+    parser.add_argument("--serve", action="store_true", help="Read JSON-line requests from stdin and emit one JSON result per line")
+    parser.add_argument("--batch", type=str, default=None, help="File listing one image path per line; emits one JSON result line per image")
+    parser.add_argument("--jobs", type=int, default=0, help="Batch: worker processes (0 = one per CPU)")
     args = parser.parse_args()
 
-    regions, width, height, err = detect_regions(
-        args.image_path,
+    kwargs = dict(
         min_area_ratio=args.min_area,
         max_regions=args.max_regions,
         strategy=args.strategy,
@@ -909,13 +1306,58 @@ def main():
         template_match_min_dist_ratio=args.template_match_min_dist_ratio,
         rectangles_epsilon_ratio=args.rectangles_epsilon_ratio,
         template_box=_parse_template_box(args.template_box),
+        max_side=args.max_side,
+        simplify=args.simplify,
+        parallel=not args.no_parallel,
     )
+
+    if args.serve:
+        _serve(kwargs)
+        return
+    if args.batch:
+        with open(args.batch) as f:
+            paths = [line.strip() for line in f if line.strip()]
+        results = detect_regions_batch(paths, n_jobs=args.jobs or None, **kwargs)
+        for path, (regions, width, height, err) in zip(paths, results):
+            if err:
+                out = {"image_path": path, "error": err}
+            else:
+                out = {"image_path": path, "regions": regions,
+                       "width": width, "height": height}
+            print(json.dumps(out, separators=(",", ":")))
+        return
+    if args.image_path is None:
+        parser.error("image_path is required unless --serve or --batch is given")
+
+    cache_file = None
+    if args.cache:
+        try:
+            cache_file = _cache_path(args.image_path, kwargs)
+            if os.path.exists(cache_file):
+                with open(cache_file) as f:
+                    sys.stdout.write(f.read())
+                return
+        except OSError:
+            cache_file = None
+
+    regions, width, height, err = detect_regions(args.image_path, **kwargs)
     if err:
         print(json.dumps({"error": err}), file=sys.stderr)
         sys.exit(1)
 
     out = {"regions": regions, "width": width, "height": height}
-    print(json.dumps(out))
+    # Compact separators: the regions list dominates the payload and the
+    # default ", " padding adds ~15% pure whitespace for the reader to parse
+    payload = json.dumps(out, separators=(",", ":"))
+    if cache_file is not None:
+        try:
+            tmp = cache_file + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(payload + "\n")
+            os.replace(tmp, cache_file)
+        except OSError:
+            pass
+    print(payload)
 
 
 if __name__ == "__main__":